@@ -134,11 +134,8 @@ def WriteReg(value: int, address: int, handle: tR5560_Handle):
     """
     Register 32 bits
     """
-    return mydll.NI_WriteReg(
-        c_uint32(value),
-        c_uint32(address),
-        byref(handle),
-    )
+    # plain ints are converted by ctypes through the declared argtypes
+    return mydll.NI_WriteReg(value, address, byref(handle))
 
 
 def ReadReg(address: int, handle: tR5560_Handle):
@@ -146,11 +143,7 @@ def ReadReg(address: int, handle: tR5560_Handle):
     read register 32 bits with (err, value).
     """
     out = c_uint32(0)
-    err = mydll.NI_ReadReg(
-        byref(out),
-        c_uint32(address),
-        byref(handle),
-    )
+    err = mydll.NI_ReadReg(byref(out), address, byref(handle))
     return err, out.value
 
 
@@ -169,11 +162,11 @@ def ReadFifo(buffer, count: int, data_addr: int, status_addr: int,
     valid = c_uint32(0)
     err = mydll.NI_ReadFifo(
         buffer,
-        c_uint32(count),
-        c_uint32(data_addr),
-        c_uint32(status_addr),
-        c_int(bus_mode),
-        c_uint32(timeout_ms),
+        count,
+        data_addr,
+        status_addr,
+        bus_mode,
+        timeout_ms,
         byref(handle),
         byref(valid),
     )
@@ -0,0 +1,438 @@
+import numpy as np
+import time
+import datetime
+import queue
+import threading
+from ctypes import c_uint32
+from array import array
+import ROOT
+
+try:
+    from numba import njit
+except ImportError:  # numpy fallback in decode_event
+    njit = None
+
+from DT5560Digitizer_Functions import (
+    ConnectDevice, CloseDevice,
+    WriteReg, ReadFifo
+)
+import DT5560Digitizer_RegisterFile as RF
+
+
+# -------------------------------------------------------
+IP_BOARD = "172.25.26.120"
+
+CHANNELS = 32
+WAVE_LEN = 40
+TS_NS = 8.0  # 8 ns por sample
+
+# ADC range
+ADC_MIN = 6000
+ADC_MAX = 8300
+ADC_BIN = 4
+NBIN_ADC = (ADC_MAX - ADC_MIN) // ADC_BIN
+
+# min amplitude histos
+MIN_ADC_MIN = 6200
+MIN_ADC_MAX = 8200
+NBIN_MINHIST = (MIN_ADC_MAX - MIN_ADC_MIN) // 8
+
+# structure
+EVENT_HEADER_WORDS = 16
+WORDS_PER_SAMPLE = 16  # = 32 canales / 2
+EVENT_WORDS = EVENT_HEADER_WORDS + WORDS_PER_SAMPLE * WAVE_LEN
+
+# Lecture FIFO
+TIMEOUT_MS = 200
+FIFO_CHUNK = EVENT_WORDS * 2
+
+# FIFO buffer reused for every read (copied out before the next one)
+FIFO_BUF = (c_uint32 * FIFO_CHUNK)()
+FIFO_VIEW = np.frombuffer(FIFO_BUF, dtype=np.uint32)
+
+# raw words of one event; a read can overshoot EVENT_WORDS by up to FIFO_CHUNK.
+# The reader thread fills them, main decodes them and hands them back.
+EVENT_POOL = 4
+EVENT_BUFS = [np.empty(EVENT_WORDS * 4, dtype=np.uint32) for _ in range(EVENT_POOL)]
+
+# FillN buffers, same time axis for every event
+TIMES_ARR = np.arange(WAVE_LEN, dtype=np.float64) * TS_NS
+WEIGHTS_ARR = np.ones(WAVE_LEN, dtype=np.float64)
+AMPS_BUF = np.empty((CHANNELS, WAVE_LEN), dtype=np.float64)
+
+GUI_PERIOD_S = 1.0  # ROOT GUI events at most once per second
+
+# TTree I/O
+BASKET_SIZE = 1 << 18  # 256 kB baskets for the waveforms branch
+# LZ4 level 4 (algorithm * 100 + level), cheaper than the default zlib at a
+# similar ratio; waveforms stay raw uint16 (/s), offsets from the baseline
+# would wrap for samples below ADC_MIN
+COMPRESSION = ROOT.RCompressionSetting.EAlgorithm.kLZ4 * 100 + 4
+
+
+# -------------------------------------------------------
+# Decode
+# -------------------------------------------------------
+if njit is not None:
+    @njit(cache=True, boundscheck=False)
+    def decode_event_nb(arr, waves):
+        # arr (WAVE_LEN, 16) uint32, waves (32, WAVE_LEN) uint16
+        for i in range(arr.shape[0]):
+            for p in range(arr.shape[1]):
+                w = arr[i, p]
+                waves[2 * p, i] = w & 0xFFFF
+                waves[2 * p + 1, i] = (w >> 16) & 0xFFFF
+
+
+def decode_event(event, out):
+    # decodes into out (CHANNELS, WAVE_LEN) uint16, e.g. the tree branch buffer
+    # event is a uint32 view of an event buffer, sliced and reshaped without copying
+    # (WAVE_LEN, 16) words, each word packs two channels (low / high 16 bits)
+    arr = event[EVENT_HEADER_WORDS:EVENT_WORDS].reshape(WAVE_LEN, WORDS_PER_SAMPLE)
+
+    if njit is not None:
+        decode_event_nb(arr, out)
+    else:
+        out[0::2, :] = (arr & 0xFFFF).T
+        out[1::2, :] = (arr >> 16).T
+
+    return out
+
+
+def find_header(data):
+    # index of the first 0xFFFFFFFF word, -1 if there is none
+    m = data == 0xFFFFFFFF
+    return int(m.argmax()) if m.any() else -1
+
+
+# -------------------------------------------------------
+def create_histos():
+    h = []
+    for ch in range(CHANNELS):
+        H = ROOT.TH2D(
+            f"h2_ch{ch}", f"ch {ch}; time, ns; amplitude, ADC",
+            WAVE_LEN, 0, WAVE_LEN * TS_NS,
+            NBIN_ADC, ADC_MIN, ADC_MAX
+        )
+        H.SetStats(False)
+        h.append(H)
+    return h
+
+
+def create_min_histos():
+    h = []
+    for ch in range(CHANNELS):
+        H = ROOT.TH1D(
+            f"h1_min_ch{ch}",
+            f"Min ADC ch {ch}; Min amplitude; Counts",
+            NBIN_MINHIST, MIN_ADC_MIN, MIN_ADC_MAX
+        )
+        h.append(H)
+    return h
+
+
+# -------------------------------------------------------
+def draw_canvas(hlist):
+    # drawn once, refresh_canvas() repaints the pads
+    c = ROOT.TCanvas("c", "DT5560 - Persistence 32ch", 1600, 900)
+    c.Divide(8, 4)
+    for ch in range(CHANNELS):
+        c.cd(ch + 1)
+        hlist[ch].Draw("*")
+    c.Update()
+    return c
+
+
+def draw_min_canvas(hlist):
+    # drawn once, refresh_canvas() repaints the pads
+    c = ROOT.TCanvas("canvas_min", "min amplitud", 1200, 800)
+    c.Divide(8, 4)
+    ROOT.gStyle.SetOptStat(1110)
+    for ch in range(CHANNELS):
+        c.cd(ch + 1)
+        hlist[ch].SetStats(1)
+        hlist[ch].Draw("hist")
+        ROOT.gPad.SetLogy(1)
+    c.Update()
+    return c
+
+
+def refresh_canvas(c):
+    # Fill() does not flag the pads, mark them so Update() repaints them
+    for ch in range(CHANNELS):
+        c.GetPad(ch + 1).Modified()
+    c.Modified()
+    c.Update()
+
+
+# -------------------------------------------------------
+class EventPipeline:
+    """
+    DT5560 acquisition: FIFO read -> decode -> histos / TTree.
+
+    min_hist:   fill and draw the per-channel min amplitude histos
+    event_time: store the readout time (us) in an event_time_us branch
+    """
+
+    def __init__(self, n_events: int, threshold: int,
+                 min_hist: bool = True, event_time: bool = False):
+        self.n_events = n_events
+        self.refresh_every = max(1, n_events // 10)  # update each 10%
+        self.threshold = threshold
+        self.min_hist = min_hist
+        self.event_time = event_time
+        self.handle = None
+
+    # ROOT ******
+
+    def open_output(self):
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        outname = f"acq_{timestamp}.root"
+        print(f"output: {outname}")
+
+        ROOT.gStyle.SetPalette(ROOT.kBird)
+        ROOT.gStyle.SetOptStat(0)
+
+        # parallel basket compression
+        ROOT.EnableImplicitMT()
+
+        self.fout = ROOT.TFile(outname, "RECREATE")
+        # before the tree is created, so its branches inherit it
+        self.fout.SetCompressionSettings(COMPRESSION)
+        self.tree = ROOT.TTree("events", "DT5560 waveforms")
+        self.tree.SetAutoFlush(self.n_events)  # one cluster per run
+        self.tree.SetAutoSave(0)
+
+        # Branch
+        if self.event_time:
+            self.event_time_us = array('Q', [0])
+            self.tree.Branch("event_time_us", self.event_time_us, "event_time_us/l")
+        self.wave_array = np.zeros((CHANNELS, WAVE_LEN), dtype=np.uint16)
+        br = self.tree.Branch("waveforms", self.wave_array,
+                              f"waveforms[{CHANNELS}][{WAVE_LEN}]/s")
+        br.SetBasketSize(BASKET_SIZE)
+        br.SetCompressionSettings(COMPRESSION)
+
+    def create_plots(self):
+        # Persistence
+        self.h2 = create_histos()
+        self.canvas = draw_canvas(self.h2)
+
+        if not self.min_hist:
+            return
+
+        # Amplitude
+        self.h1_min = create_min_histos()
+        self.canvas_min = draw_min_canvas(self.h1_min)
+
+        # min values are filled in blocks of refresh_every events
+        self.mins_buffer = np.empty((CHANNELS, self.refresh_every), dtype=np.float64)
+        self.mins_weights = np.ones(self.refresh_every, dtype=np.float64)
+        self.n_mins = 0
+
+    # digitizer ******
+
+    def connect(self):
+        print("Conected to DT5560...")
+        err, self.handle = ConnectDevice(IP_BOARD)
+        if err != 0:
+            print("ERROR conection:", err)
+            return False
+        print("successful Conected")
+        return True
+
+    def configure(self):
+        WriteReg(self.threshold, RF.SCI_REG_threshold, self.handle)
+        WriteReg(10, RF.SCI_REG_Delay, self.handle)
+        WriteReg(WAVE_LEN, RF.SCI_REG_Digitizer_0_ACQ_LEN, self.handle)
+
+    def start_digitizer(self):
+        cfg_addr = RF.SCI_REG_Digitizer_0_CONFIG
+        CH = CHANNELS
+        WriteReg(2 + (CH << 8), cfg_addr, self.handle)
+        WriteReg(0 + (CH << 8), cfg_addr, self.handle)
+        WriteReg(1 + (CH << 8), cfg_addr, self.handle)
+
+    def read_event(self, buf):
+        # reads at least EVENT_WORDS words into buf, returns the word count
+        # locals only inside the FIFO loop
+        read_fifo = ReadFifo
+        sleep = time.sleep
+        fifo_buf, fifo_view = FIFO_BUF, FIFO_VIEW
+        fifo_addr = RF.SCI_REG_Digitizer_0_FIFOADDRESS
+        stat_addr = RF.SCI_REG_Digitizer_0_STATUS
+        handle = self.handle
+
+        self.start_digitizer()
+
+        write = 0
+        while write < EVENT_WORDS:
+            err, valid = read_fifo(
+                fifo_buf, FIFO_CHUNK,
+                fifo_addr, stat_addr,
+                1, TIMEOUT_MS, handle
+            )
+
+            if valid == 0:
+                sleep(0.0005)
+                continue
+
+            buf[write:write + valid] = fifo_view[:valid]
+            write += valid
+
+        return write
+
+    def _reader(self, free_bufs, full_bufs):
+        # pushes (buf, write, event_time) per event, None when it stops
+        get_free, put_full = free_bufs.get, full_bufs.put
+        read_event = self.read_event
+        utcnow = datetime.datetime.utcnow
+        try:
+            for _ in range(self.n_events):
+                buf = get_free()
+                write = read_event(buf)
+                put_full((buf, write, int(utcnow().timestamp() * 1e6)))
+        finally:
+            full_bufs.put(None)
+
+    # event processing ******
+
+    def decode(self, event, out):
+        return decode_event(event, out)
+
+    def fill(self, waves):
+        # TH2D
+        amps, times, weights = AMPS_BUF, TIMES_ARR, WEIGHTS_ARR
+        np.copyto(amps, waves)
+        for ch, h in enumerate(self.h2):
+            h.FillN(WAVE_LEN, times, amps[ch], weights)
+
+        # TH1D
+        if self.min_hist:
+            self.mins_buffer[:, self.n_mins] = waves.min(axis=1)
+            self.n_mins += 1
+            if self.n_mins == self.refresh_every:
+                self.flush_mins()
+
+    def flush_mins(self):
+        n = self.n_mins
+        if n > 0:
+            for ch in range(CHANNELS):
+                self.h1_min[ch].FillN(n, self.mins_buffer[ch, :n], self.mins_weights[:n])
+        self.n_mins = 0
+
+    def refresh(self):
+        if self.min_hist:
+            self.flush_mins()
+
+        # pads were drawn once in create_plots()
+        refresh_canvas(self.canvas)
+        if self.min_hist:
+            refresh_canvas(self.canvas_min)
+
+    # run ******
+
+    def run(self):
+        self.open_output()
+        self.create_plots()
+
+        if not self.connect():
+            return
+        self.configure()
+
+        # FIFO reads run in a thread: ctypes releases the GIL while the library
+        # blocks, so the next event is read while main decodes and fills
+        free_bufs = queue.Queue()
+        for buf in EVENT_BUFS:
+            free_bufs.put(buf)
+        full_bufs = queue.Queue(maxsize=EVENT_POOL)
+
+        print("Acq started")
+
+        # acquisition
+        # bound once, the loop below only does local lookups
+        n_events = self.n_events
+        refresh_every = self.refresh_every
+        wave_array = self.wave_array
+        event_time_us = self.event_time_us if self.event_time else None
+        get_full, put_free = full_bufs.get, free_bufs.put
+        decode, fill, tree_fill = self.decode, self.fill, self.tree.Fill
+        monotonic = time.monotonic
+        process_events = ROOT.gSystem.ProcessEvents
+
+        reader_thread = threading.Thread(
+            target=self._reader, args=(free_bufs, full_bufs), daemon=True
+        )
+        reader_thread.start()
+        last_gui = monotonic()
+        for iev in range(n_events):
+
+            # progress
+            if iev % refresh_every == 0:
+                pct = 100.0 * iev / n_events
+                print(f"[{iev}/{n_events}]  {pct:.1f}%")
+
+            item = get_full()
+            if item is None:
+                print("reader stopped")
+                break
+            buf, write, event_time = item
+            data = buf[:write]
+
+            # Header
+            idx = find_header(data)
+            if idx < 0:
+                print("Event without header. Ignored.")
+                put_free(buf)
+                continue
+
+            if idx + EVENT_WORDS > len(data):
+                print("Event not completed. Ignored.")
+                put_free(buf)
+                continue
+
+            event = buf[idx: idx + EVENT_WORDS]  # view, no copy
+
+            # Decode
+            waves = decode(event, wave_array)
+            put_free(buf)
+
+            # histos
+            fill(waves)
+
+            if event_time_us is not None:
+                event_time_us[0] = event_time
+            tree_fill()
+
+            # Canvas
+            if iev > 0 and (iev % refresh_every == 0):
+                print(f"[REFRESH] Event {iev}/{n_events}  ({100*iev/n_events:.1f}%)")
+                self.refresh()
+
+            # keep the GUI responsive without tying it to the event rate
+            t_gui = monotonic()
+            if t_gui - last_gui >= GUI_PERIOD_S:
+                process_events()
+                last_gui = t_gui
+
+        reader_thread.join()
+
+        self.close()
+
+    def close(self):
+        if self.min_hist:
+            self.flush_mins()
+
+        # histos and tree were created after fout was opened, so fout owns
+        # them and fout.Write() writes all of them in every mode
+        print("writing ROOT file")
+        self.fout.Write()
+        self.fout.Close()
+
+        CloseDevice(self.handle)
+        print("conection closed.")
+
+
+# -------------------------------------------------------
+def main(n_events=100, threshold=7800, min_hist=True, event_time=False):
+    EventPipeline(n_events, threshold, min_hist, event_time).run()